@@ -1,32 +1,116 @@
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
+import logging
+import re
 from dataclasses import dataclass
-from typing import List, Optional
+from functools import lru_cache
+from typing import Any, List, Optional
+
+import httpx
 
 try:
     import logfire
 except ImportError:  # pragma: no cover - optional dependency in lightweight dev envs
     logfire = None
 from pydantic_ai import Agent
+from pydantic_ai.models.google import GoogleModel, GoogleModelSettings
+from pydantic_ai.providers.google import GoogleProvider
 
-from .analytics import build_stats
-from .parser import extract_candidate_from_text, validate_candidate
+from .batching import PromptBatcher
+from .cache import (
+    LRUCache,
+    ResponseCache,
+    SemanticExtractionCache,
+    extraction_key,
+    normalize_text,
+)
+from .parser import (
+    extract_candidate_from_text,
+    extract_glucose_level,
+    has_glucose_token,
+    validate_candidate,
+)
 from .schemas import (
-    BloodSugarReading,
     ChatMessage,
     InvalidReading,
-    MealStatus,
     ReadingCandidate,
+    ReadingStats,
     RouterResult,
 )
 from .settings import AppSettings
 
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+ROUTER_INSTRUCTIONS = (
+    "Route the user request to one of four intents: "
+    "log_reading, trend_question, education, or general_chat. "
+    "Choose log_reading if the message appears to include a glucose value or "
+    "a request to record/update a reading."
+)
+
+EXTRACTION_INSTRUCTIONS = (
+    "Extract a glucose reading candidate from the user's message. "
+    "Return glucose_level, date, and meal_status when present. "
+    "Use today's date from context for relative dates like today or yesterday. "
+    "Do not invent missing values."
+)
+
+BATCH_EXTRACTION_INSTRUCTIONS = (
+    "You will receive several numbered requests. Each has its own today's date "
+    "and user message. For each one, extract a glucose reading candidate: "
+    "glucose_level, date, and meal_status when present, resolving relative dates "
+    "against that request's date. Do not invent missing values and never mix "
+    "details between requests. Return exactly one candidate per request, in order."
+)
+
+CONVERSATION_INSTRUCTIONS = (
+    "You are Glucose Buddy, a careful diabetes logging assistant. "
+    "You help users record glucose readings, explain trends in plain language, "
+    "and answer general educational questions. "
+    "You are not a doctor and should not prescribe medication changes. "
+    "When discussing readings, be concise, supportive, and specific."
+)
+
+TREND_KEYWORDS = ("trend", "average", "history", "compare")
+EDUCATION_KEYWORDS = ("normal", "target", "what should", "range")
+
+GREETING_REPLY = "Hi! Share a reading like '118 today fasting', or ask about your trends."
+THANKS_REPLY = "You're welcome. Send your next reading whenever you have it."
+ACKNOWLEDGEMENT_REPLY = "Sounds good. I'm here when you want to log a reading."
+
+# Whole-message small talk, matched after lowercasing and dropping punctuation.
+CANNED_REPLIES = {
+    **dict.fromkeys(
+        ("hi", "hello", "hey", "hiya", "good morning", "good afternoon", "good evening"),
+        GREETING_REPLY,
+    ),
+    **dict.fromkeys(
+        ("thanks", "thank you", "thanks a lot", "thank you so much", "thx", "ty"),
+        THANKS_REPLY,
+    ),
+    **dict.fromkeys(
+        ("ok", "okay", "k", "got it", "cool", "great", "sounds good", "will do"),
+        ACKNOWLEDGEMENT_REPLY,
+    ),
+}
+
+
+# Stats come from the repository's running aggregates, so nothing handed to the
+# conversation agent requires a pass over the reading history.
+@dataclass(frozen=True, slots=True)
 class AgentDeps:
     today: dt.date
-    readings: List[BloodSugarReading]
+    stats: ReadingStats
+
+
+@lru_cache(maxsize=1024)
+def canned_reply(text: str) -> Optional[str]:
+    # Greetings and acknowledgements need neither the router nor a model reply.
+    normalized = " ".join(re.sub(r"[^\w\s]", " ", normalize_text(text)).split())
+    return CANNED_REPLIES.get(normalized)
 
 
 def configure_observability(settings: AppSettings) -> None:
@@ -39,44 +123,87 @@ def configure_observability(settings: AppSettings) -> None:
     )
 
 
+# google-genai passes a single float timeout with every request, which httpx
+# applies to every phase, so the shorter connect limit is restored per request
+# at the transport.
+class ConnectTimeoutTransport(httpx.AsyncBaseTransport):
+    def __init__(self, connect_timeout: float, transport: httpx.AsyncBaseTransport):
+        self.connect_timeout = connect_timeout
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        timeout = dict(request.extensions.get("timeout") or {})
+        connect = timeout.get("connect")
+        if connect is None or connect > self.connect_timeout:
+            timeout["connect"] = self.connect_timeout
+        request.extensions["timeout"] = timeout
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def build_http_client(
+    settings: AppSettings, transport: Optional[httpx.AsyncBaseTransport] = None
+) -> httpx.AsyncClient:
+    # One pooled HTTP client serves every agent, so router, extraction and
+    # conversation calls reuse the same warm connections.
+    if transport is None:
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_keepalive,
+            ),
+        )
+    connect_timeout = settings.llm_connect_timeout_seconds
+    return httpx.AsyncClient(
+        transport=ConnectTimeoutTransport(connect_timeout, transport),
+        timeout=settings.llm_timeout_seconds,
+    )
+
+
 def build_agents(settings: AppSettings) -> "AgentSuite":
     if not settings.llm_enabled:
         return AgentSuite(settings=settings)
 
-    model = "google-gla:{name}".format(name=settings.google_model)
+    http_client = build_http_client(settings)
+    model = GoogleModel(
+        settings.google_model,
+        provider=GoogleProvider(api_key=settings.google_api_key, http_client=http_client),
+    )
+    cache = None
+    if settings.llm_cache_ttl_seconds > 0:
+        cache = ResponseCache(settings.llm_cache_file, settings.llm_cache_ttl_seconds)
+    semantic_cache = None
+    if settings.semantic_cache_threshold > 0:
+        semantic_cache = SemanticExtractionCache(settings.semantic_cache_threshold)
 
     router = Agent(
         model,
         output_type=RouterResult,
-        instructions=(
-            "Route the user request to one of four intents: "
-            "log_reading, trend_question, education, or general_chat. "
-            "Choose log_reading if the message appears to include a glucose value or "
-            "a request to record/update a reading."
-        ),
+        **_prompt_options(ROUTER_INSTRUCTIONS, settings.router_cached_content),
     )
 
     extraction = Agent(
         model,
         output_type=ReadingCandidate,
-        instructions=(
-            "Extract a glucose reading candidate from the user's message. "
-            "Return glucose_level, date, and meal_status when present. "
-            "Use today's date from context for relative dates like today or yesterday. "
-            "Do not invent missing values."
-        ),
+        **_prompt_options(EXTRACTION_INSTRUCTIONS, settings.extraction_cached_content),
     )
 
+    batch_extraction = None
+    if settings.extraction_batch_single_call:
+        batch_extraction = Agent(
+            model,
+            output_type=List[ReadingCandidate],
+            instructions=BATCH_EXTRACTION_INSTRUCTIONS,
+        )
+
     conversation = Agent(
         model,
         deps_type=AgentDeps,
         output_type=str,
-        instructions=(
-            "You are Glucose Buddy, a careful diabetes logging assistant. "
-            "You help users record glucose readings, explain trends in plain language, "
-            "and answer general educational questions. "
-            "You are not a doctor and should not prescribe medication changes. "
-            "When discussing readings, be concise, supportive, and specific."
+        **_prompt_options(
+            CONVERSATION_INSTRUCTIONS, settings.conversation_cached_content
         ),
     )
 
@@ -85,9 +212,22 @@ def build_agents(settings: AppSettings) -> "AgentSuite":
         router_agent=router,
         extraction_agent=extraction,
         conversation_agent=conversation,
+        batch_extraction_agent=batch_extraction,
+        cache=cache,
+        semantic_cache=semantic_cache,
+        http_client=http_client,
     )
 
 
+def _prompt_options(instructions: str, cached_content: str) -> dict:
+    # Gemini rejects a system instruction alongside cached content, so an agent
+    # backed by a provider-side cache takes its instructions from the cache.
+    if cached_content:
+        settings = GoogleModelSettings(google_cached_content=cached_content)
+        return {"model_settings": settings}
+    return {"instructions": instructions}
+
+
 class AgentSuite:
     def __init__(
         self,
@@ -95,39 +235,94 @@ class AgentSuite:
         router_agent: Optional[Agent] = None,
         extraction_agent: Optional[Agent] = None,
         conversation_agent: Optional[Agent] = None,
+        batch_extraction_agent: Optional[Agent] = None,
+        cache: Optional[ResponseCache] = None,
+        semantic_cache: Optional[SemanticExtractionCache] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
     ):
         self.settings = settings
         self.router_agent = router_agent
         self.extraction_agent = extraction_agent
         self.conversation_agent = conversation_agent
+        self.batch_extraction_agent = batch_extraction_agent
+        self.cache = cache
+        self.semantic_cache = semantic_cache
+        self.extraction_lru: Optional[LRUCache[ReadingCandidate]] = None
+        if settings.extraction_lru_size > 0:
+            self.extraction_lru = LRUCache(settings.extraction_lru_size)
+        self.http_client = http_client
+        self.extraction_batcher: Optional[PromptBatcher[ReadingCandidate]] = None
+        if extraction_agent is not None and settings.extraction_batch_window_ms > 0:
+            run_many = None
+            if batch_extraction_agent is not None:
+                run_many = self._run_extraction_batch
+            self.extraction_batcher = PromptBatcher(
+                self._run_extraction,
+                window_seconds=settings.extraction_batch_window_ms / 1000,
+                max_batch=settings.extraction_batch_size,
+                run_many=run_many,
+            )
+        # Caps in-flight model calls per worker so bursts queue here instead of
+        # tripping the provider's rate limits.
+        self.llm_slots: Optional[asyncio.Semaphore] = None
+        if settings.llm_concurrency > 0:
+            self.llm_slots = asyncio.Semaphore(settings.llm_concurrency)
 
-    async def classify_intent(
-        self, text: str, today: dt.date, readings: List[BloodSugarReading]
-    ) -> RouterResult:
-        parsed = extract_candidate_from_text(text, today)
-        if parsed.glucose_level is not None:
+    async def warm_up(self) -> None:
+        # One cheap routing call opens the pooled connection and lets the provider
+        # see the static instruction prefix before the first user message.
+        # It is best effort: a provider outage must not keep the app from starting.
+        if self.router_agent is None:
+            return
+        try:
+            await self._call(self.router_agent, "hello")
+        except Exception as error:
+            logger.warning("Agent warm-up failed: %s", error)
+
+    async def aclose(self) -> None:
+        if self.extraction_batcher is not None:
+            await self.extraction_batcher.aclose()
+        if self.http_client is not None:
+            await self.http_client.aclose()
+        if self.cache is not None:
+            self.cache.close()
+
+    def classify_locally(self, text: str, today: dt.date) -> Optional[RouterResult]:
+        # Routing only trusts anchored values; bare numbers are left to extraction.
+        if extract_glucose_level(text) is not None:
             return RouterResult(
                 intent="log_reading",
                 reasoning="Detected a likely glucose measurement in the message.",
             )
         lowered = text.lower()
-        if any(word in lowered for word in ["trend", "average", "history", "compare"]):
+        if any(word in lowered for word in TREND_KEYWORDS):
             return RouterResult(
                 intent="trend_question",
                 reasoning="The user is asking about prior readings or summary patterns.",
             )
-        if any(word in lowered for word in ["normal", "target", "what should", "range"]):
+        if any(word in lowered for word in EDUCATION_KEYWORDS):
             return RouterResult(
                 intent="education",
                 reasoning="The user is asking an educational glucose question.",
             )
+        # Questions are settled above, so a lone number with a meal keyword
+        # ("118 today fasting") can only be a reading here.
+        if extract_glucose_level(text, allow_bare=True) is not None:
+            return RouterResult(
+                intent="log_reading",
+                reasoning="Detected a lone glucose value with a meal keyword.",
+            )
         if self.router_agent is None:
             return RouterResult(
                 intent="general_chat",
                 reasoning="Using deterministic fallback classification.",
             )
-        result = await self.router_agent.run(text)
-        return result.output
+        return None
+
+    async def route(self, text: str) -> RouterResult:
+        return await self._run(
+            self.router_agent, ROUTER_INSTRUCTIONS, text, RouterResult
+        )
 
     async def extract_reading(
         self, text: str, today: dt.date
@@ -137,54 +332,144 @@ class AgentSuite:
         if issue is None:
             return parsed
 
-        if self.extraction_agent is None:
+        # Without a 2-3 digit number there is no value for the model to find.
+        if self.extraction_agent is None or not has_glucose_token(text):
             return parsed
 
-        result = await self.extraction_agent.run(
-            "today is {today}\nmessage: {text}".format(today=today.isoformat(), text=text)
-        )
-        candidate = result.output
+        key = extraction_key(text, today)
+        candidate = None
+        if self.extraction_lru is not None:
+            cached = self.extraction_lru.get(key)
+            if cached is not None:
+                candidate = cached.model_copy()
+        if candidate is None and self.semantic_cache is not None:
+            candidate = self.semantic_cache.get(text, today)
+        if candidate is None:
+            prompt = "today is {today}\nmessage: {text}".format(
+                today=today.isoformat(), text=text
+            )
+            if self.extraction_batcher is not None:
+                # Batched results may be shared between identical prompts.
+                shared = await self.extraction_batcher.submit(prompt)
+                candidate = shared.model_copy()
+            else:
+                candidate = await self._run_extraction(prompt)
+            # Incomplete answers are not worth replaying; the user will rephrase.
+            if validate_candidate(candidate, today) is None:
+                if self.extraction_lru is not None:
+                    self.extraction_lru.set(key, candidate.model_copy())
+                if self.semantic_cache is not None:
+                    self.semantic_cache.set(text, today, candidate)
         if candidate.notes is None:
             candidate.notes = text.strip()
         return candidate
 
+    async def _run_extraction(self, prompt: str) -> ReadingCandidate:
+        return await self._run(
+            self.extraction_agent, EXTRACTION_INSTRUCTIONS, prompt, ReadingCandidate
+        )
+
+    async def _run_extraction_batch(self, prompts: List[str]) -> List[ReadingCandidate]:
+        results: List[Optional[ReadingCandidate]] = [None] * len(prompts)
+        keys = [self._cache_key(EXTRACTION_INSTRUCTIONS, prompt) for prompt in prompts]
+        if self.cache is not None:
+            for index, key in enumerate(keys):
+                results[index] = self.cache.get(key, ReadingCandidate)
+
+        missing = [index for index, result in enumerate(results) if result is None]
+        if len(missing) == 1:
+            results[missing[0]] = await self._run_extraction(prompts[missing[0]])
+        elif missing:
+            numbered = "\n\n".join(
+                "request {number}:\n{prompt}".format(number=number, prompt=prompts[index])
+                for number, index in enumerate(missing, start=1)
+            )
+            result = await self._call(self.batch_extraction_agent, numbered)
+            if len(result.output) != len(missing):
+                # A miscounted answer cannot be aligned safely; ask one at a time.
+                logger.debug(
+                    "Batch extraction returned %d results for %d prompts",
+                    len(result.output),
+                    len(missing),
+                )
+                candidates = await asyncio.gather(
+                    *(self._run_extraction(prompts[index]) for index in missing)
+                )
+            else:
+                candidates = result.output
+            for index, candidate in zip(missing, candidates):
+                results[index] = candidate
+                if self.cache is not None:
+                    self.cache.set(keys[index], candidate, ReadingCandidate)
+        return results
+
     async def reply(
         self,
         user_message: str,
         today: dt.date,
-        readings: List[BloodSugarReading],
+        stats: ReadingStats,
         history: List[ChatMessage],
     ) -> str:
         if self.conversation_agent is None:
-            return self._fallback_reply(user_message, readings)
+            return self._fallback_reply(user_message, stats)
 
         prompt = user_message
-        if readings:
-            stats = build_stats(readings)
+        if stats.total_readings:
+            # Least-changing context first so consecutive turns share a longer prefix.
             prompt = (
-                f"User message: {user_message}\n"
                 f"Stats: total={stats.total_readings}, "
-                f"avg_fasting={stats.avg_fasting}, avg_prandial={stats.avg_prandial}"
+                f"avg_fasting={stats.avg_fasting}, avg_prandial={stats.avg_prandial}\n"
+                f"User message: {user_message}"
             )
 
-        result = await self.conversation_agent.run(
+        return await self._run(
+            self.conversation_agent,
+            CONVERSATION_INSTRUCTIONS,
             prompt,
-            deps=AgentDeps(today=today, readings=readings),
+            str,
+            context=today.isoformat(),
+            deps=AgentDeps(today=today, stats=stats),
             message_history=[],
         )
+
+    async def _run(
+        self,
+        agent: Agent,
+        instructions: str,
+        prompt: str,
+        output_type: Any,
+        context: str = "",
+        **kwargs: Any,
+    ) -> Any:
+        if self.cache is None:
+            result = await self._call(agent, prompt, **kwargs)
+            return result.output
+
+        key = self._cache_key(instructions, prompt, context)
+        cached = self.cache.get(key, output_type)
+        if cached is not None:
+            return cached
+        result = await self._call(agent, prompt, **kwargs)
+        self.cache.set(key, result.output, output_type)
         return result.output
 
-    def _fallback_reply(
-        self, user_message: str, readings: List[BloodSugarReading]
-    ) -> str:
+    async def _call(self, agent: Agent, prompt: str, **kwargs: Any) -> Any:
+        if self.llm_slots is None:
+            return await agent.run(prompt, **kwargs)
+        async with self.llm_slots:
+            return await agent.run(prompt, **kwargs)
+
+    def _cache_key(self, instructions: str, prompt: str, context: str = "") -> str:
+        return ResponseCache.key(self.settings.google_model, instructions, context, prompt)
+
+    def _fallback_reply(self, user_message: str, stats: ReadingStats) -> str:
         lowered = user_message.lower()
         if "normal" in lowered or "range" in lowered:
             return (
                 "Typical fasting glucose is about 70-100 mg/dL, and many after-meal "
                 "targets are under 140 mg/dL two hours after eating."
             )
-        if readings:
-            stats = build_stats(readings)
+        if stats.total_readings:
             return (
                 f"You have {stats.total_readings} readings recorded. "
                 "Share a reading like '118 today fasting' and I can log it."
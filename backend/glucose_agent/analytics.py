@@ -1,49 +1,73 @@
 from __future__ import annotations
 
-from typing import List
+from typing import List, Optional
 
-from .schemas import BloodSugarReading, MealStatus, ReadingStats, TrendInsight
+from .schemas import (
+    BloodSugarReading,
+    MealAggregate,
+    MealStatus,
+    ReadingAggregates,
+    ReadingStats,
+    TrendInsight,
+)
+
+
+def build_aggregates(readings: List[BloodSugarReading]) -> ReadingAggregates:
+    aggregates = ReadingAggregates()
+    for reading in readings:
+        add_to_aggregates(aggregates, reading)
+    return aggregates
+
+
+def add_to_aggregates(aggregates: ReadingAggregates, reading: BloodSugarReading) -> None:
+    aggregate = aggregate_for(aggregates, reading.meal_status)
+    aggregate.total += reading.glucose_level
+    aggregate.count += 1
+    aggregate.latest = reading
+
+
+def aggregate_for(aggregates: ReadingAggregates, status: MealStatus) -> MealAggregate:
+    if status == MealStatus.FASTING:
+        return aggregates.fasting
+    return aggregates.prandial
 
 
 def build_stats(readings: List[BloodSugarReading]) -> ReadingStats:
-    if not readings:
-        return ReadingStats()
+    return stats_from_aggregates(build_aggregates(readings))
 
-    fasting = [reading for reading in readings if reading.meal_status == MealStatus.FASTING]
-    prandial = [
-        reading for reading in readings if reading.meal_status == MealStatus.PRANDIAL
-    ]
 
+def stats_from_aggregates(aggregates: ReadingAggregates) -> ReadingStats:
+    fasting = aggregates.fasting
+    prandial = aggregates.prandial
     return ReadingStats(
-        total_readings=len(readings),
-        has_fasting=bool(fasting),
-        has_prandial=bool(prandial),
-        avg_fasting=round(sum(r.glucose_level for r in fasting) / len(fasting), 1)
-        if fasting
-        else None,
-        avg_prandial=round(sum(r.glucose_level for r in prandial) / len(prandial), 1)
-        if prandial
-        else None,
-        latest_fasting=fasting[-1] if fasting else None,
-        latest_prandial=prandial[-1] if prandial else None,
+        total_readings=fasting.count + prandial.count,
+        has_fasting=bool(fasting.count),
+        has_prandial=bool(prandial.count),
+        avg_fasting=_average(fasting),
+        avg_prandial=_average(prandial),
+        latest_fasting=fasting.latest,
+        latest_prandial=prandial.latest,
     )
 
 
 def build_trend_insight(
-    readings: List[BloodSugarReading], new_reading: BloodSugarReading
+    aggregates: ReadingAggregates, new_reading: BloodSugarReading
 ) -> TrendInsight:
-    comparable = [
-        reading
-        for reading in readings
-        if reading.meal_status == new_reading.meal_status and reading != new_reading
-    ]
-    if not comparable:
+    # ``aggregates`` must describe the history before ``new_reading`` was saved.
+    aggregate = aggregate_for(aggregates, new_reading.meal_status)
+    average = aggregate.total / aggregate.count if aggregate.count else None
+    return _trend_insight(new_reading, average)
+
+
+def _trend_insight(
+    new_reading: BloodSugarReading, average: Optional[float]
+) -> TrendInsight:
+    if average is None:
         return TrendInsight(
             summary="This is your first recorded reading in that category.",
             in_expected_range=_in_expected_range(new_reading),
         )
 
-    average = sum(reading.glucose_level for reading in comparable) / len(comparable)
     delta = round(new_reading.glucose_level - average, 1)
 
     if abs(delta) < 10:
@@ -70,8 +94,13 @@ def build_trend_insight(
     )
 
 
+def _average(aggregate: MealAggregate) -> Optional[float]:
+    if not aggregate.count:
+        return None
+    return round(aggregate.total / aggregate.count, 1)
+
+
 def _in_expected_range(reading: BloodSugarReading) -> bool:
     if reading.meal_status == MealStatus.FASTING:
         return 70 <= reading.glucose_level <= 100
     return reading.glucose_level < 140
-
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+
+T = TypeVar("T")
+
+_Pending = Tuple[str, asyncio.Future]
+
+
+# Prompts submitted within a short window are dispatched together, and identical
+# prompts share a single call, so a burst of the same message from several
+# sessions costs one model round trip. With ``run_many`` a window of distinct
+# prompts is answered by one call as well.
+class PromptBatcher(Generic[T]):
+    def __init__(
+        self,
+        run: Callable[[str], Awaitable[T]],
+        window_seconds: float,
+        max_batch: int,
+        run_many: Optional[Callable[[List[str]], Awaitable[List[T]]]] = None,
+    ):
+        self._run = run
+        self._run_many = run_many
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._dispatches: Set[asyncio.Task] = set()
+
+    async def submit(self, prompt: str) -> T:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._collect())
+
+        future: asyncio.Future[T] = loop.create_future()
+        await self._queue.put((prompt, future))
+        return await future
+
+    async def aclose(self) -> None:
+        # Stops the collector and any dispatch in flight; prompts still queued
+        # are cancelled so their callers do not wait forever.
+        if self._loop is not asyncio.get_running_loop():
+            return
+        tasks = list(self._dispatches)
+        if self._worker is not None:
+            tasks.append(self._worker)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+        self._worker = None
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[_Pending] = [await self._queue.get()]
+            deadline = loop.time() + self.window_seconds
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            task = loop.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[_Pending]) -> None:
+        waiting: Dict[str, List[asyncio.Future]] = {}
+        for prompt, future in batch:
+            waiting.setdefault(prompt, []).append(future)
+
+        prompts = list(waiting)
+        results: List[Any]
+        if self._run_many is not None and len(prompts) > 1:
+            try:
+                results = list(await self._run_many(prompts))
+            except BaseException as error:
+                results = [error] * len(prompts)
+        else:
+            try:
+                results = await asyncio.gather(
+                    *(self._run(prompt) for prompt in prompts), return_exceptions=True
+                )
+            except asyncio.CancelledError as error:
+                results = [error] * len(prompts)
+        for prompt, result in zip(prompts, results):
+            for future in waiting[prompt]:
+                if future.done():
+                    continue
+                if isinstance(result, asyncio.CancelledError):
+                    future.cancel()
+                elif isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import hashlib
+import logging
+import math
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Any, Deque, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from pydantic import TypeAdapter
+
+from .parser import DATE_PHRASES, extract_meal_status
+from .schemas import MealStatus, ReadingCandidate
+
+
+T = TypeVar("T")
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# Words that carry the date of a reading; paraphrases must agree on all of them.
+DATE_WORDS = frozenset(
+    WEEKDAYS
+    + (
+        "jan", "january", "feb", "february", "mar", "march", "apr", "april",
+        "may", "jun", "june", "jul", "july", "aug", "august", "sep", "sept",
+        "september", "oct", "october", "nov", "november", "dec", "december",
+        "today", "yesterday", "tonight", "last", "night", "morning", "afternoon",
+        "evening", "ago", "day", "days", "week", "weeks", "this", "next",
+    )
+)
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    return unicodedata.normalize("NFC", text).strip().lower()
+
+
+def extraction_key(text: str, today: dt.date) -> str:
+    # Punctuation and spacing are dropped, and the day it was asked is part of
+    # every key: relative dates ("monday", "2 days ago") resolve differently on
+    # another day, so a result is only replayed on the day it was extracted.
+    lowered = re.sub(r"[^\w\s/.-]", " ", normalize_text(text))
+    lowered = today.isoformat() + "\0" + " ".join(lowered.split())
+    return hashlib.blake2b(lowered.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class LRUCache(Generic[T]):
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[str, T]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[T]:
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: T) -> None:
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+
+class ResponseCache:
+    def __init__(self, path: Path, ttl_seconds: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._adapters: Dict[Any, TypeAdapter] = {}
+        # _lock only guards the in-memory buffers; each connection has its own
+        # lock, so lookups never wait on a flush that is committing.
+        self._lock = Lock()
+        self._pending: Dict[str, Tuple[str, float]] = {}
+        self._flushing: Dict[str, Tuple[str, float]] = {}
+        self._flush_scheduled = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Long-lived autocommit connections, one for the flusher and one for
+        # lookups; WAL lets readers carry on while a writer commits.
+        self._write_lock = Lock()
+        self._conn = self._connect()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_expires_at ON responses (expires_at)"
+        )
+        self._read_lock = Lock()
+        self._read_conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(normalize_text(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str, output_type: Any) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._pending.get(key) or self._flushing.get(key)
+        if row is None:
+            with self._read_lock:
+                row = self._read_conn.execute(
+                    "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        return self._adapter(output_type).validate_json(row[0])
+
+    def set(self, key: str, value: Any, output_type: Any) -> None:
+        payload = self._adapter(output_type).dump_json(value).decode("utf-8")
+        with self._lock:
+            self._pending[key] = (payload, time.time() + self.ttl_seconds)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+
+        # Writes are buffered (and visible to get() immediately) and flushed in a
+        # worker thread, so a turn never waits on SQLite's commit.
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        loop.run_in_executor(None, self.flush).add_done_callback(_log_flush_error)
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                self._flush_scheduled = False
+                if not self._pending:
+                    return
+                # Rows being written stay visible to get() until they commit.
+                self._flushing, self._pending = self._pending, {}
+                rows = [(key, *row) for key, row in self._flushing.items()]
+            try:
+                self._write(rows)
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    def _write(self, rows: List[Tuple[str, str, float]]) -> None:
+        # One transaction per flush rather than one commit per response.
+        # Expired rows are pruned through the expires_at index in the same
+        # transaction so the table only holds live entries.
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute(
+                "DELETE FROM responses WHERE expires_at <= ?", (time.time(),)
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _adapter(self, output_type: Any) -> TypeAdapter:
+        adapter = self._adapters.get(output_type)
+        if adapter is None:
+            adapter = self._adapters[output_type] = TypeAdapter(output_type)
+        return adapter
+
+    def close(self) -> None:
+        self.flush()
+        with self._write_lock:
+            self._conn.close()
+        with self._read_lock:
+            self._read_conn.close()
+
+
+def _log_flush_error(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Response cache flush failed: %s", future.exception())
+
+
+@dataclass
+class _SemanticEntry:
+    guard: Tuple[Any, ...]
+    vector: Counter
+    norm: float
+    candidate: ReadingCandidate
+    day_offset: Optional[int]
+
+
+# Paraphrases are matched on bag-of-words cosine similarity, but only against
+# entries with exactly the same numbers, locally parsed meal status and date
+# words, so a different value, meal or day never hits. Relative dates are kept
+# as an offset from the day they were resolved; everything else (weekday names,
+# absolute dates, or no date words at all) only matches on the day it was
+# stored, because the resolved date cannot be re-derived on another day.
+class SemanticExtractionCache:
+    def __init__(self, threshold: float, max_entries: int = 512):
+        self.threshold = threshold
+        self._entries: Deque[_SemanticEntry] = deque(maxlen=max_entries)
+
+    def get(self, text: str, today: dt.date) -> Optional[ReadingCandidate]:
+        guard, vector = _vectorize(text, today)
+        norm = _norm(vector)
+        if not norm:
+            return None
+
+        best: Optional[_SemanticEntry] = None
+        best_score = self.threshold
+        for entry in self._entries:
+            if entry.guard != guard:
+                continue
+            score = _dot(vector, entry.vector) / (norm * entry.norm)
+            if score >= best_score:
+                best, best_score = entry, score
+        if best is None:
+            return None
+
+        candidate = best.candidate.model_copy()
+        if best.day_offset is not None:
+            candidate.date = today + dt.timedelta(days=best.day_offset)
+        return candidate
+
+    def set(self, text: str, today: dt.date, candidate: ReadingCandidate) -> None:
+        guard, vector = _vectorize(text, today)
+        norm = _norm(vector)
+        if not norm:
+            return
+
+        # Only unanchored (relative) entries can be replayed on a later day.
+        day_offset = None
+        if candidate.date is not None and guard[-1] is None:
+            day_offset = (candidate.date - today).days
+        self._entries.append(
+            _SemanticEntry(
+                guard=guard,
+                vector=vector,
+                norm=norm,
+                candidate=candidate.model_copy(update={"notes": None}),
+                day_offset=day_offset,
+            )
+        )
+
+
+def _vectorize(text: str, today: dt.date) -> Tuple[Tuple[Any, ...], Counter]:
+    lowered = normalize_text(text)
+    numbers = tuple(sorted(re.findall(r"\d+(?:\.\d+)?", lowered)))
+    words = re.findall(r"[a-z]+", lowered)
+    date_words = tuple(sorted(word for word in words if word in DATE_WORDS))
+    meal_status: Optional[MealStatus] = extract_meal_status(text)
+    relative = _is_relative(lowered) and not any(word in WEEKDAYS for word in date_words)
+    anchor = None if relative else today
+    return (numbers, meal_status, date_words, anchor), Counter(words)
+
+
+def _norm(vector: Counter) -> float:
+    return math.sqrt(sum(count * count for count in vector.values()))
+
+
+def _dot(left: Counter, right: Counter) -> float:
+    if len(left) > len(right):
+        left, right = right, left
+    return float(sum(count * right[word] for word, count in left.items()))
+
+
+def _is_relative(text: str) -> bool:
+    lowered = text.lower()
+    return "ago" in lowered or any(phrase in lowered for phrase in DATE_PHRASES)
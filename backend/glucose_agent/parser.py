@@ -10,6 +10,7 @@ except ImportError:  # pragma: no cover - optional in minimal environments
     dateparser = None
 
 from .schemas import BloodSugarReading, InvalidReading, MealStatus, ReadingCandidate
+from .validation import check_reading_values
 
 
 MEAL_KEYWORDS = {
@@ -20,6 +21,9 @@ MEAL_KEYWORDS = {
         "empty stomach",
         "woke up",
         "this morning fasting",
+        "pre-meal",
+        "pre meal",
+        "before meal",
     ],
     MealStatus.PRANDIAL: [
         "after breakfast",
@@ -29,10 +33,56 @@ MEAL_KEYWORDS = {
         "post-meal",
         "after meal",
         "after eating",
+        "post breakfast",
+        "post lunch",
+        "post dinner",
         "prandial",
     ],
 }
 
+# Short meter-log abbreviations only count as whole words ("pp" is not "happy").
+MEAL_ABBREVIATIONS = {
+    MealStatus.FASTING: re.compile(r"\b(?:fbs|fbg|fasting bs)\b"),
+    MealStatus.PRANDIAL: re.compile(r"\b(?:pp|ppbs|ppg)\b"),
+}
+
+# Durations and units that mark a number as something other than glucose.
+NON_GLUCOSE_UNIT = (
+    r"(?!\s*(?:days?|weeks?|hours?|hrs?|minutes?|mins?|min|am|pm|units?|u"
+    r"|carbs?|grams?|g|lbs?|pounds?|kgs?|kilos?|calories|cals?|kcal"
+    r"|steps?|bpm|years?|yrs?|yo|people|persons?|guests?|%)(?!\w))"
+)
+
+# A standalone 2-3 digit number that is not part of a date or a time, and is
+# not followed by a duration or another unit ("10 days ago", "180 lbs").
+BARE_GLUCOSE_PATTERN = re.compile(
+    r"(?<![\d/.:-])(\d{2,3}(?:\.\d+)?)(?![\d/:-])" + NON_GLUCOSE_UNIT,
+    flags=re.IGNORECASE,
+)
+
+# Cheap pre-filter: a message without a 2-3 digit number cannot hold a reading,
+# so it never needs the extraction model.
+GLUCOSE_TOKEN_PATTERN = re.compile(r"(?<!\d)\d{2,3}(?!\d)")
+
+GLUCOSE_VALUE_PATTERNS = [
+    re.compile(r"(\d{2,3}(?:\.\d+)?)\s*(?:mg/?dL|mg dl|mg)\b", flags=re.IGNORECASE),
+    re.compile(
+        r"(?:glucose|blood sugar|sugar|reading)\D{0,12}(\d{2,3}(?:\.\d+)?)\b",
+        flags=re.IGNORECASE,
+    ),
+    re.compile(
+        r"\b(?:was|is|at)\s+(\d{2,3}(?:\.\d+)?)\b(?!:)" + NON_GLUCOSE_UNIT,
+        flags=re.IGNORECASE,
+    ),
+]
+
+DAYS_AGO_PATTERN = re.compile(r"\b(\d+)\s+days?\s+ago\b")
+NUMERIC_DATE_PATTERN = re.compile(r"\b\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?\b")
+MONTH_DATE_PATTERN = re.compile(
+    r"\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+    r"\s+\d{1,2}(?:,\s*\d{4})?\b"
+)
+
 DATE_PHRASES = [
     "today",
     "yesterday",
@@ -61,11 +111,27 @@ def extract_reading_from_text(
     )
 
 
+def has_glucose_token(text: str) -> bool:
+    return GLUCOSE_TOKEN_PATTERN.search(text) is not None
+
+
+def extract_glucose_level(text: str, allow_bare: bool = False) -> Optional[float]:
+    # By default only anchored values ("was 118", "118 mg/dL") count; with
+    # allow_bare a lone number next to an explicit meal keyword counts too.
+    if allow_bare:
+        return _extract_glucose_level(text, text.lower())
+    return _extract_glucose_value(text)
+
+
+def extract_meal_status(text: str) -> Optional[MealStatus]:
+    return _extract_meal_status(text.lower())
+
+
 def extract_candidate_from_text(text: str, today: dt.date) -> ReadingCandidate:
     lowered = text.lower()
-    glucose_level = _extract_glucose_value(text)
-    parsed_date = _extract_date(text, today)
     meal_status = _extract_meal_status(lowered)
+    glucose_level = _extract_glucose_level(text, lowered)
+    parsed_date = _extract_date(text, today)
 
     notes = None
     if glucose_level is not None:
@@ -92,49 +158,49 @@ def validate_candidate(
     if missing:
         return InvalidReading(reason="Missing " + ", ".join(missing) + ".")
 
-    if candidate.glucose_level is not None and not 30 <= candidate.glucose_level <= 600:
-        return InvalidReading(
-            reason=(
-                "Blood sugar must be within a realistic meter range "
-                "between 30 and 600 mg/dL."
-            )
-        )
-    if candidate.date and candidate.date > today:
-        return InvalidReading(reason="Date cannot be in the future.")
+    reason = check_reading_values(candidate.glucose_level, candidate.date, today)
+    if reason is not None:
+        return InvalidReading(reason=reason)
     return None
 
 
 def _extract_glucose_value(text: str) -> Optional[float]:
-    patterns = [
-        r"(\d{2,3}(?:\.\d+)?)\s*(?:mg/?dL|mg dl|mg)\b",
-        r"(?:glucose|blood sugar|sugar|reading)\D{0,12}(\d{2,3}(?:\.\d+)?)\b",
-        r"\b(?:was|is|at)\s+(\d{2,3}(?:\.\d+)?)\b",
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, text, flags=re.IGNORECASE)
+    for pattern in GLUCOSE_VALUE_PATTERNS:
+        match = pattern.search(text)
         if match:
             return float(match.group(1))
     return None
 
 
+def _extract_glucose_level(text: str, lowered: str) -> Optional[float]:
+    glucose_level = _extract_glucose_value(text)
+    if glucose_level is None and _explicit_meal_status(lowered) is not None:
+        # "118 today fasting": an explicit meal keyword marks the lone number as a
+        # reading. The looser "morning"/"lunch" hints are not enough for that.
+        glucose_level = _extract_bare_glucose_value(text)
+    return glucose_level
+
+
+def _extract_bare_glucose_value(text: str) -> Optional[float]:
+    matches = BARE_GLUCOSE_PATTERN.findall(text)
+    if len(matches) != 1:
+        return None
+    return float(matches[0])
+
+
 def _extract_date(text: str, today: dt.date) -> Optional[dt.date]:
     lowered = text.lower()
     if "today" in lowered:
         return today
     if "yesterday" in lowered or "last night" in lowered:
         return today - dt.timedelta(days=1)
-    relative_match = re.search(r"\b(\d+)\s+days?\s+ago\b", lowered)
+    relative_match = DAYS_AGO_PATTERN.search(lowered)
     if relative_match:
         return today - dt.timedelta(days=int(relative_match.group(1)))
 
     candidates = [phrase for phrase in DATE_PHRASES if phrase in lowered]
-    candidates.extend(re.findall(r"\b\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?\b", text))
-    candidates.extend(
-        re.findall(
-            r"\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+\d{1,2}(?:,\s*\d{4})?\b",
-            lowered,
-        )
-    )
+    candidates.extend(NUMERIC_DATE_PATTERN.findall(text))
+    candidates.extend(MONTH_DATE_PATTERN.findall(lowered))
 
     ordered = candidates + [text]
     for chunk in ordered:
@@ -144,11 +210,20 @@ def _extract_date(text: str, today: dt.date) -> Optional[dt.date]:
     return None
 
 
-def _extract_meal_status(lowered: str) -> Optional[MealStatus]:
+def _explicit_meal_status(lowered: str) -> Optional[MealStatus]:
     for status, keywords in MEAL_KEYWORDS.items():
         if any(keyword in lowered for keyword in keywords):
             return status
+    for status, pattern in MEAL_ABBREVIATIONS.items():
+        if pattern.search(lowered):
+            return status
+    return None
+
 
+def _extract_meal_status(lowered: str) -> Optional[MealStatus]:
+    status = _explicit_meal_status(lowered)
+    if status is not None:
+        return status
     if "breakfast" in lowered or "lunch" in lowered or "dinner" in lowered:
         return MealStatus.PRANDIAL
     if "morning" in lowered:
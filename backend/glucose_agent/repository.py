@@ -1,72 +1,250 @@
 from __future__ import annotations
 
-import json
 import datetime as dt
+import os
+from contextlib import contextmanager
 from pathlib import Path
 from threading import Lock
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
-from .schemas import BloodSugarReading, ChatMessage, MealStatus, SessionState
+from pydantic import TypeAdapter
+from pydantic_core import from_json, to_json
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - unavailable on Windows
+    fcntl = None
+
+from .analytics import add_to_aggregates, build_aggregates, build_trend_insight
+from .schemas import (
+    BloodSugarReading,
+    ChatMessage,
+    MealStatus,
+    ReadingAggregates,
+    SessionState,
+    TrendInsight,
+)
+
+
+_Signature = Tuple[int, int, int]
+
+_READINGS_ADAPTER = TypeAdapter(List[BloodSugarReading])
 
 
 class GlucoseRepository:
-    def __init__(self, data_file: Path):
+    def __init__(self, data_file: Path, history_limit: Optional[int] = None):
         self.data_file = data_file
+        self.history_limit = history_limit
         self._lock = Lock()
+        self._lock_file = data_file.with_name(data_file.name + ".lock")
+        self._lock_fd: Optional[int] = None
+        self._readings_cache: Optional[Tuple[_Signature, List[BloodSugarReading]]] = None
+        self._readings_json_cache: Optional[Tuple[_Signature, str]] = None
+        self._aggregates_cache: Optional[Tuple[_Signature, ReadingAggregates]] = None
+        self._sessions_cache: Tuple[_Signature, Dict[str, SessionState]] = (
+            (0, 0, 0),
+            {},
+        )
         self.data_file.parent.mkdir(parents=True, exist_ok=True)
-        if not self.data_file.exists():
-            self._write(
-                {
-                    "readings": [reading.model_dump(mode="json") for reading in _demo_readings()],
-                    "sessions": {},
-                }
-            )
+        with self._locked():
+            if not self.data_file.exists():
+                readings = _demo_readings()
+                self._write(
+                    {
+                        "readings": [reading.model_dump(mode="json") for reading in readings],
+                        "aggregates": build_aggregates(readings).model_dump(mode="json"),
+                        "sessions": {},
+                    }
+                )
 
     def list_readings(self) -> List[BloodSugarReading]:
-        payload = self._read()
-        return [BloodSugarReading.model_validate(item) for item in payload["readings"]]
+        return list(self._cached_readings()[1])
 
-    def save_reading(self, reading: BloodSugarReading) -> int:
-        with self._lock:
+    def readings_json(self) -> str:
+        # The serialized history is reused until the readings change, so
+        # repeated history requests do not re-encode every reading.
+        signature, readings = self._cached_readings()
+        cached = self._readings_json_cache
+        if cached is None or cached[0] != signature:
+            cached = (signature, _READINGS_ADAPTER.dump_json(readings).decode("utf-8"))
+            self._readings_json_cache = cached
+        return cached[1]
+
+    def get_aggregates(self) -> ReadingAggregates:
+        # Like the readings, aggregates are only re-read when the file changes.
+        signature = self._signature()
+        cached = self._aggregates_cache
+        if cached is None or cached[0] != signature:
+            cached = self._aggregates_cache = (signature, self._aggregates(self._read()))
+        return cached[1].model_copy(deep=True)
+
+    def trend_insight(self, reading: BloodSugarReading) -> TrendInsight:
+        # Call before saving ``reading`` so it is compared against prior history.
+        return build_trend_insight(self.get_aggregates(), reading)
+
+    def save_reading(
+        self,
+        reading: BloodSugarReading,
+        session_id: Optional[str] = None,
+        reply: Optional[str] = None,
+    ) -> int:
+        # With a session, its pending reading is cleared and the reply appended
+        # in the same state file write as the reading itself.
+        with self._locked():
             payload = self._read()
+            aggregates = self._aggregates(payload)
+            add_to_aggregates(aggregates, reading)
             payload["readings"].append(reading.model_dump(mode="json"))
-            self._write(payload)
+            payload["aggregates"] = aggregates.model_dump(mode="json")
+            if session_id is None:
+                self._write(payload)
+            else:
+                session = self.get_session(session_id)
+                session.pending_reading = None
+                if reply is not None:
+                    message = ChatMessage(role="assistant", content=reply)
+                    self._add_messages(session, [message])
+                self._save_session(session, payload)
+            self._aggregates_cache = (self._signature(), aggregates)
             return len(payload["readings"])
 
     def get_session(self, session_id: str) -> SessionState:
-        payload = self._read()
-        raw = payload["sessions"].get(session_id)
-        if raw is None:
-            return SessionState(session_id=session_id)
-        return SessionState.model_validate(raw)
+        # Sessions validated (or just written) by this process are reused while
+        # the state file is unchanged, so a turn does not re-validate its history.
+        signature = self._signature()
+        cached_signature, sessions = self._sessions_cache
+        if cached_signature != signature:
+            sessions = {}
+            self._sessions_cache = (signature, sessions)
+        session = sessions.get(session_id)
+        if session is None:
+            raw = self._read()["sessions"].get(session_id)
+            if raw is None:
+                return SessionState(session_id=session_id)
+            session = sessions[session_id] = SessionState.model_validate(raw)
+        return _copy_session(session)
 
     def save_session(self, session: SessionState) -> None:
-        with self._lock:
-            payload = self._read()
-            payload["sessions"][session.session_id] = session.model_dump(mode="json")
-            self._write(payload)
+        with self._locked():
+            self._save_session(session)
+
+    def append_message(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        created_at: Optional[dt.datetime] = None,
+    ) -> SessionState:
+        if created_at is None:
+            message = ChatMessage(role=role, content=content)
+        else:
+            message = ChatMessage(role=role, content=content, created_at=created_at)
+        return self.append_messages(session_id, [message])
 
-    def append_message(self, session_id: str, role: str, content: str) -> SessionState:
-        session = self.get_session(session_id)
-        session.history.append(ChatMessage(role=role, content=content))
-        self.save_session(session)
+    def append_messages(
+        self, session_id: str, messages: Sequence[ChatMessage]
+    ) -> SessionState:
+        with self._locked():
+            session = self.get_session(session_id)
+            self._add_messages(session, messages)
+            self._save_session(session)
         return session
 
     def set_pending_reading(
-        self, session_id: str, reading: BloodSugarReading | None
+        self,
+        session_id: str,
+        reading: BloodSugarReading | None,
+        messages: Sequence[ChatMessage] = (),
     ) -> SessionState:
-        session = self.get_session(session_id)
-        session.pending_reading = reading
-        self.save_session(session)
+        with self._locked():
+            session = self.get_session(session_id)
+            session.pending_reading = reading
+            self._add_messages(session, messages)
+            self._save_session(session)
         return session
 
+    def close(self) -> None:
+        with self._lock:
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+    def _add_messages(
+        self, session: SessionState, messages: Sequence[ChatMessage]
+    ) -> None:
+        session.history.extend(messages)
+        if self.history_limit:
+            # Keep only the recent window so the state file (rewritten on
+            # every turn) does not grow with the length of the conversation.
+            del session.history[: -self.history_limit]
+
+    def _save_session(self, session: SessionState, payload: Optional[Dict] = None) -> None:
+        if payload is None:
+            payload = self._read()
+        payload["sessions"][session.session_id] = session.model_dump(mode="json")
+        self._write(payload)
+        self._sessions_cache = (
+            self._signature(),
+            {session.session_id: _copy_session(session)},
+        )
+
+    def _aggregates(self, payload: Dict) -> ReadingAggregates:
+        # State files written before aggregates were tracked are backfilled once.
+        raw = payload.get("aggregates")
+        if raw is None:
+            return build_aggregates(_READINGS_ADAPTER.validate_python(payload["readings"]))
+        return ReadingAggregates.model_validate(raw)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # The thread lock covers this process; flock covers other uvicorn workers
+        # writing the same state file.
+        # The lock file descriptor is opened once and reused for every write.
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            if self._lock_fd is None:
+                self._lock_fd = os.open(self._lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _cached_readings(self) -> Tuple[_Signature, List[BloodSugarReading]]:
+        # Validated readings are reused until the state file is replaced, which
+        # every write does, so unchanged history is not re-parsed per message.
+        signature = self._signature()
+        cached = self._readings_cache
+        if cached is None or cached[0] != signature:
+            readings = _READINGS_ADAPTER.validate_python(self._read()["readings"])
+            cached = self._readings_cache = (signature, readings)
+        return cached
+
+    def _signature(self) -> _Signature:
+        try:
+            stat = self.data_file.stat()
+        except FileNotFoundError:
+            return (0, 0, 0)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
     def _read(self) -> Dict:
         if not self.data_file.exists():
             return {"readings": [], "sessions": {}}
-        return json.loads(self.data_file.read_text() or '{"readings": [], "sessions": {}}')
+        return from_json(self.data_file.read_bytes() or b'{"readings": [], "sessions": {}}')
 
     def _write(self, payload: Dict) -> None:
-        self.data_file.write_text(json.dumps(payload, indent=2))
+        # Write then rename so readers in other workers never see a partial file.
+        staged = self.data_file.with_name(self.data_file.name + ".tmp")
+        staged.write_bytes(to_json(payload, indent=2))
+        os.replace(staged, self.data_file)
+
+
+def _copy_session(session: SessionState) -> SessionState:
+    # Messages are never mutated in place, so a fresh history list is enough to
+    # keep callers from changing the cached session.
+    return session.model_copy(update={"history": list(session.history)})
 
 
 def _demo_readings() -> List[BloodSugarReading]:
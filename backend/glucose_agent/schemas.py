@@ -2,10 +2,15 @@ from __future__ import annotations
 
 import datetime as dt
 from enum import Enum
-from typing import Any, Dict, List, Literal, Optional, Union
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field
 
+from .validation import MAX_GLUCOSE, MIN_GLUCOSE
+
+
+GlucoseLevel = Annotated[float, Field(ge=MIN_GLUCOSE, le=MAX_GLUCOSE)]
+
 
 class MealStatus(str, Enum):
     FASTING = "fasting"
@@ -18,7 +23,7 @@ class ReadingSource(str, Enum):
 
 
 class BloodSugarReading(BaseModel):
-    glucose_level: float = Field(ge=30, le=600, description="Blood glucose in mg/dL")
+    glucose_level: GlucoseLevel = Field(description="Blood glucose in mg/dL")
     date: dt.date
     meal_status: MealStatus
     notes: Optional[str] = None
@@ -53,6 +58,17 @@ class ReadingStats(BaseModel):
     latest_prandial: Optional[BloodSugarReading] = None
 
 
+class MealAggregate(BaseModel):
+    total: float = 0.0
+    count: int = 0
+    latest: Optional[BloodSugarReading] = None
+
+
+class ReadingAggregates(BaseModel):
+    fasting: MealAggregate = Field(default_factory=MealAggregate)
+    prandial: MealAggregate = Field(default_factory=MealAggregate)
+
+
 class ChatMessage(BaseModel):
     role: Literal["user", "assistant"]
     content: str
@@ -1,23 +1,45 @@
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
-from typing import List
+from typing import List, Optional
 from uuid import uuid4
 
-from .agents import AgentSuite
-from .analytics import build_stats, build_trend_insight
-from .parser import validate_candidate
+from .agents import AgentSuite, canned_reply
+from .analytics import stats_from_aggregates
+from .parser import has_glucose_token, validate_candidate
 from .repository import GlucoseRepository
 from .schemas import (
     BloodSugarReading,
+    ChatMessage,
     HistoryUpdateEvent,
     InvalidReading,
+    MealStatus,
     MessageEvent,
     ReadingExtractedEvent,
+    ReadingStats,
     SessionState,
     StatsUpdateEvent,
     WebSocketEvent,
 )
+from .validation import check_reading_values
+
+
+RANGE_TARGETS = {
+    MealStatus.FASTING: "Typical fasting targets are often around 70-100 mg/dL.",
+    MealStatus.PRANDIAL: (
+        "Many after-meal targets are under 140 mg/dL two hours after eating."
+    ),
+}
+
+# The greeting never changes, so its frame is encoded once at import.
+WELCOME_EVENT = MessageEvent(
+    message=(
+        "Hi. I can log glucose readings, explain trends, and answer "
+        "basic blood sugar questions. Try '118 today fasting'."
+    )
+)
+WELCOME_FRAME = WELCOME_EVENT.model_dump_json()
 
 
 class GlucoseService:
@@ -34,29 +56,66 @@ class GlucoseService:
     def get_history_event(self) -> HistoryUpdateEvent:
         return HistoryUpdateEvent(readings=self.repository.list_readings())
 
+    def history_frame(self) -> str:
+        # A history_update frame built from the repository's serialized readings,
+        # so sending history does not validate or re-encode every reading.
+        readings = self.repository.readings_json()
+        return '{"type":"history_update","readings":' + readings + "}"
+
+    def encode_event(self, event: WebSocketEvent) -> str:
+        return event.model_dump_json()
+
     def get_stats_event(self) -> StatsUpdateEvent:
-        return StatsUpdateEvent(stats=build_stats(self.repository.list_readings()))
+        return StatsUpdateEvent(stats=self._current_stats())
 
-    async def welcome_events(self) -> List[WebSocketEvent]:
-        return [
-            MessageEvent(
-                message=(
-                    "Hi. I can log glucose readings, explain trends, and answer "
-                    "basic blood sugar questions. Try '118 today fasting'."
-                )
-            )
-        ]
+    def welcome_frames(self) -> List[str]:
+        return [WELCOME_FRAME]
 
     async def handle_message(
         self, session_id: str, text: str
     ) -> List[WebSocketEvent]:
-        today = dt.date.today()
-        readings = self.repository.list_readings()
-        session = self.repository.append_message(session_id, "user", text)
+        # One clock read per turn: the user message timestamp and the local date
+        # used for parsing and validation come from the same instant.
+        now = dt.datetime.now(dt.timezone.utc)
+        today = now.astimezone().date()
+        # The user message is stored together with the reply at the end of the
+        # turn, so a turn rewrites the state file once.
+        user_message = ChatMessage(role="user", content=text, created_at=now)
+
+        canned = canned_reply(text)
+        if canned is not None:
+            self.repository.append_messages(
+                session_id, [user_message, ChatMessage(role="assistant", content=canned)]
+            )
+            return [MessageEvent(message=canned)]
+
+        history = self.repository.get_session(session_id).history + [user_message]
+
+        # When the router agent has to be consulted, draft the conversational reply
+        # (and the extraction, if the message carries a number) at the same time;
+        # they are independent model round trips and the unused one is discarded.
+        reply_task = None
+        extract_task = None
+        intent = self.agents.classify_locally(text, today)
+        if intent is None:
+            reply_task = asyncio.create_task(
+                self.agents.reply(text, today, self._current_stats(), history)
+            )
+            if has_glucose_token(text):
+                extract_task = asyncio.create_task(self.agents.extract_reading(text, today))
+            try:
+                intent = await self.agents.route(text)
+            except BaseException:
+                _discard(reply_task)
+                _discard(extract_task)
+                raise
 
-        intent = await self.agents.classify_intent(text, today, readings)
         if intent.intent == "log_reading":
-            candidate = await self.agents.extract_reading(text, today)
+            _discard(reply_task)
+            if extract_task is not None:
+                candidate = await extract_task
+            else:
+                candidate = await self.agents.extract_reading(text, today)
             issue = validate_candidate(candidate, today)
             if issue is None:
                 reading = BloodSugarReading(
@@ -65,21 +124,34 @@ class GlucoseService:
                     meal_status=candidate.meal_status,
                     notes=candidate.notes,
                 )
-                self.repository.set_pending_reading(session_id, reading)
                 assistant_text = (
                     f"I extracted {reading.glucose_level:.0f} mg/dL for "
                     f"{reading.date.isoformat()} as {reading.meal_status.value}. "
                     "Please confirm it below."
                 )
-                self.repository.append_message(session_id, "assistant", assistant_text)
+                self.repository.set_pending_reading(
+                    session_id,
+                    reading,
+                    messages=[
+                        user_message,
+                        ChatMessage(role="assistant", content=assistant_text),
+                    ],
+                )
                 return [
                     ReadingExtractedEvent(reading=reading),
                     MessageEvent(message=assistant_text),
                 ]
+            self.repository.append_messages(session_id, [user_message])
             return [MessageEvent(message=self._format_invalid_reading(issue))]
 
-        reply = await self.agents.reply(text, today, readings, session.history)
-        self.repository.append_message(session_id, "assistant", reply)
+        _discard(extract_task)
+        if reply_task is not None:
+            reply = await reply_task
+        else:
+            reply = await self.agents.reply(text, today, self._current_stats(), history)
+        self.repository.append_messages(
+            session_id, [user_message, ChatMessage(role="assistant", content=reply)]
+        )
 
         events: List[WebSocketEvent] = [MessageEvent(message=reply)]
         if intent.intent == "trend_question":
@@ -89,28 +161,34 @@ class GlucoseService:
     async def confirm_reading(
         self, session_id: str, reading: BloodSugarReading, notes: str = ""
     ) -> List[WebSocketEvent]:
+        reason = check_reading_values(reading.glucose_level, reading.date, dt.date.today())
+        if reason is not None:
+            issue = InvalidReading(reason=reason)
+            message = MessageEvent(message=self._format_invalid_reading(issue))
+            return [message]
+
         stored = reading.model_copy()
         if notes.strip():
             stored.notes = notes.strip()
 
-        self.repository.save_reading(stored)
-        self.repository.set_pending_reading(session_id, None)
-
-        updated = self.repository.list_readings()
-        insight = build_trend_insight(updated, stored)
+        insight = self.repository.trend_insight(stored)
         follow_up = (
             "Saved your reading. "
             f"{insight.summary} "
             + self._range_message(stored)
         ).strip()
 
-        self.repository.append_message(session_id, "assistant", follow_up)
+        # The reading, the cleared pending reading and the reply share one write.
+        self.repository.save_reading(stored, session_id=session_id, reply=follow_up)
         return [
             MessageEvent(message=follow_up),
             self.get_history_event(),
             self.get_stats_event(),
         ]
 
+    def _current_stats(self) -> ReadingStats:
+        return stats_from_aggregates(self.repository.get_aggregates())
+
     def _format_invalid_reading(self, issue: InvalidReading) -> str:
         return (
             "I couldn’t log that yet. "
@@ -119,9 +197,15 @@ class GlucoseService:
         )
 
     def _range_message(self, reading: BloodSugarReading) -> str:
-        if reading.meal_status.value == "fasting":
-            target = "Typical fasting targets are often around 70-100 mg/dL."
-        else:
-            target = "Many after-meal targets are under 140 mg/dL two hours after eating."
-        return target
-
+        return RANGE_TARGETS[reading.meal_status]
+
+
+def _discard(task: Optional[asyncio.Task]) -> None:
+    if task is None:
+        return
+    if task.done():
+        # Retrieve a finished task's exception so it is not reported as unhandled.
+        if not task.cancelled():
+            task.exception()
+        return
+    task.cancel()
@@ -7,6 +7,11 @@ from typing import List
 
 from dotenv import load_dotenv
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - unavailable on Windows
+    fcntl = None
+
 
 load_dotenv()
 
@@ -18,6 +23,13 @@ def _cors_origins() -> List[str]:
     return [origin.strip() for origin in raw.split(",") if origin.strip()]
 
 
+def _default_workers() -> int:
+    # Without flock the state file is only safe to write from one process.
+    if fcntl is None:
+        return 1
+    return (os.cpu_count() or 1) * 2 + 1
+
+
 @dataclass
 class AppSettings:
     app_name: str = "Glucose Buddy API"
@@ -27,8 +39,32 @@ class AppSettings:
         "GOOGLE_API_KEY", ""
     )
     google_model: str = os.getenv("GLUCOSE_MODEL", "gemini-2.5-flash")
+    router_cached_content: str = os.getenv("GLUCOSE_ROUTER_CACHED_CONTENT", "")
+    extraction_cached_content: str = os.getenv("GLUCOSE_EXTRACTION_CACHED_CONTENT", "")
+    conversation_cached_content: str = os.getenv(
+        "GLUCOSE_CONVERSATION_CACHED_CONTENT", ""
+    )
+    llm_max_connections: int = int(os.getenv("GLUCOSE_LLM_MAX_CONNECTIONS", "200"))
+    llm_max_keepalive: int = int(os.getenv("GLUCOSE_LLM_MAX_KEEPALIVE", "100"))
+    llm_timeout_seconds: float = float(os.getenv("GLUCOSE_LLM_TIMEOUT", "30"))
+    llm_connect_timeout_seconds: float = float(
+        os.getenv("GLUCOSE_LLM_CONNECT_TIMEOUT", "5")
+    )
+    llm_concurrency: int = int(os.getenv("GLUCOSE_LLM_CONCURRENCY", "32"))
+    extraction_lru_size: int = int(os.getenv("GLUCOSE_EXTRACTION_LRU_SIZE", "4096"))
+    extraction_batch_window_ms: float = float(
+        os.getenv("GLUCOSE_EXTRACTION_BATCH_WINDOW_MS", "10")
+    )
+    extraction_batch_size: int = int(os.getenv("GLUCOSE_EXTRACTION_BATCH_SIZE", "16"))
+    extraction_batch_single_call: bool = (
+        os.getenv("GLUCOSE_EXTRACTION_BATCH_SINGLE_CALL", "false").lower() == "true"
+    )
+    warm_up_agents: bool = os.getenv("GLUCOSE_WARM_UP_AGENTS", "false").lower() == "true"
     request_limit: int = int(os.getenv("GLUCOSE_REQUEST_LIMIT", "12"))
     history_limit: int = int(os.getenv("GLUCOSE_HISTORY_LIMIT", "20"))
+    web_concurrency: int = int(
+        os.getenv("WEB_CONCURRENCY", str(_default_workers()))
+    )
     data_file: Path = field(
         default_factory=lambda: Path(
             os.getenv(
@@ -37,6 +73,18 @@ class AppSettings:
             )
         )
     )
+    llm_cache_file: Path = field(
+        default_factory=lambda: Path(
+            os.getenv(
+                "GLUCOSE_LLM_CACHE_FILE",
+                Path(__file__).resolve().parent.parent / "data" / "llm_cache.sqlite3",
+            )
+        )
+    )
+    llm_cache_ttl_seconds: int = int(os.getenv("GLUCOSE_LLM_CACHE_TTL", "86400"))
+    semantic_cache_threshold: float = float(
+        os.getenv("GLUCOSE_SEMANTIC_CACHE_THRESHOLD", "0")
+    )
 
     @property
     def llm_enabled(self) -> bool:
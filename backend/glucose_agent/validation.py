@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import datetime as dt
+from typing import Optional
+
+
+MIN_GLUCOSE = 30.0
+MAX_GLUCOSE = 600.0
+
+
+def check_reading_values(
+    glucose_level: float, date: dt.date, today: dt.date
+) -> Optional[str]:
+    if not MIN_GLUCOSE <= glucose_level <= MAX_GLUCOSE:
+        return (
+            "Blood sugar must be within a realistic meter range "
+            "between 30 and 600 mg/dL."
+        )
+    if date > today:
+        return "Date cannot be in the future."
+    return None
@@ -1,25 +1,49 @@
 from __future__ import annotations
 
 import json
+from contextlib import asynccontextmanager
+from typing import List
 
 import uvicorn
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 
 from glucose_agent.agents import build_agents, configure_observability
 from glucose_agent.repository import GlucoseRepository
-from glucose_agent.schemas import HealthResponse, WebSocketAction
+from glucose_agent.schemas import (
+    BloodSugarReading,
+    HealthResponse,
+    HistoryUpdateEvent,
+    ReadingStats,
+    WebSocketAction,
+    WebSocketEvent,
+)
 from glucose_agent.service import GlucoseService
 from glucose_agent.settings import settings
 
 
 configure_observability(settings)
 
-repository = GlucoseRepository(settings.data_file)
+repository = GlucoseRepository(settings.data_file, history_limit=settings.history_limit)
 agents = build_agents(settings)
 service = GlucoseService(repository=repository, agents=agents)
 
-app = FastAPI(title=settings.app_name)
+# Health checks are polled constantly and their body is fixed for the process.
+HEALTH_JSON = HealthResponse(
+    status="ok", llm_enabled=settings.llm_enabled
+).model_dump_json()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.warm_up_agents:
+        await agents.warm_up()
+    yield
+    await agents.aclose()
+    repository.close()
+
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_allowed_origins,
@@ -30,48 +54,65 @@ app.add_middleware(
 
 
 @app.get("/health", response_model=HealthResponse)
-async def health() -> HealthResponse:
-    return HealthResponse(status="ok", llm_enabled=settings.llm_enabled)
+async def health() -> Response:
+    return Response(content=HEALTH_JSON, media_type="application/json")
 
 
-@app.get("/api/readings")
-async def list_readings():
-    return repository.list_readings()
+# The readings body is served from the repository's serialized cache.
+@app.get("/api/readings", response_model=List[BloodSugarReading])
+async def list_readings() -> Response:
+    return Response(content=repository.readings_json(), media_type="application/json")
 
 
-@app.get("/api/stats")
-async def get_stats():
+# Declaring the response model lets FastAPI serialize straight to JSON in
+# pydantic-core instead of walking the model with jsonable_encoder.
+@app.get("/api/stats", response_model=ReadingStats)
+async def get_stats() -> ReadingStats:
     return service.get_stats_event().stats
 
 
+def encode_frame(event: WebSocketEvent) -> str:
+    # History updates always carry the full current history, so their frame is
+    # spliced from the repository's serialized readings instead of re-encoded.
+    if isinstance(event, HistoryUpdateEvent):
+        return service.history_frame()
+    return service.encode_event(event)
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     session_id = websocket.query_params.get("session_id") or service.create_session_id()
-    for event in await service.welcome_events():
-        await websocket.send_text(event.model_dump_json())
+    for frame in service.welcome_frames():
+        await websocket.send_text(frame)
 
     try:
         while True:
             payload = WebSocketAction.model_validate_json(await websocket.receive_text())
             if payload.action == "message" and payload.message:
                 events = await service.handle_message(session_id, payload.message)
+                frames = [encode_frame(event) for event in events]
             elif payload.action == "confirm_reading" and payload.reading:
                 events = await service.confirm_reading(
                     session_id, payload.reading, payload.notes or ""
                 )
+                frames = [encode_frame(event) for event in events]
             elif payload.action == "get_history":
-                events = [service.get_history_event()]
+                frames = [service.history_frame()]
             elif payload.action == "get_stats":
-                events = [service.get_stats_event()]
+                frames = [service.encode_event(service.get_stats_event())]
             else:
-                events = []
+                frames = []
 
-            for event in events:
-                await websocket.send_text(event.model_dump_json())
+            for frame in frames:
+                await websocket.send_text(frame)
     except WebSocketDisconnect:
         return
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvicorn picks uvloop/httptools automatically when they are installed; the
+    # Dockerfile pins them explicitly.
+    uvicorn.run(
+        "main:app", host="0.0.0.0", port=8000, workers=settings.web_concurrency
+    )
@@ -0,0 +1,100 @@
+import asyncio
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+from pydantic_ai import Agent
+from pydantic_ai.models.google import GoogleModel
+from pydantic_ai.providers.google import GoogleProvider
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from glucose_agent.agents import EXTRACTION_INSTRUCTIONS, AgentSuite, build_http_client
+from glucose_agent.cache import ResponseCache
+from glucose_agent.schemas import ReadingCandidate
+from glucose_agent.settings import AppSettings
+
+
+class HttpClientTests(unittest.TestCase):
+    def test_outgoing_model_request_keeps_short_connect_timeout(self):
+        timeouts = []
+
+        def respond(request):
+            timeouts.append(request.extensions["timeout"])
+            content = {"role": "model", "parts": [{"text": "hi"}]}
+            return httpx.Response(200, json={"candidates": [{"content": content}]})
+
+        async def run():
+            settings = AppSettings(llm_timeout_seconds=30, llm_connect_timeout_seconds=5)
+            client = build_http_client(settings, transport=httpx.MockTransport(respond))
+            provider = GoogleProvider(api_key="test", http_client=client)
+            model = GoogleModel("gemini-2.5-flash", provider=provider)
+            result = await Agent(model).run("hello")
+            await client.aclose()
+            return result.output
+
+        self.assertEqual(asyncio.run(run()), "hi")
+        self.assertEqual(timeouts[0]["connect"], 5)
+        self.assertEqual(timeouts[0]["read"], 30)
+
+
+class WarmUpTests(unittest.TestCase):
+    def test_warm_up_failure_is_logged_not_raised(self):
+        class Router:
+            async def run(self, prompt, **kwargs):
+                raise httpx.ConnectError("provider unreachable")
+
+        agents = AgentSuite(settings=AppSettings(), router_agent=Router())
+        with self.assertLogs("glucose_agent.agents", level="WARNING") as logs:
+            asyncio.run(agents.warm_up())
+        self.assertIn("provider unreachable", logs.output[0])
+
+
+class ExtractionBatchTests(unittest.TestCase):
+    def test_miscounted_batch_falls_back_to_single_extractions(self):
+        singles, batches = [], []
+
+        class Extraction:
+            async def run(self, prompt, **kwargs):
+                singles.append(prompt)
+                level = int(prompt.split()[-1])
+                return SimpleNamespace(output=ReadingCandidate(glucose_level=level))
+
+        class BatchExtraction:
+            async def run(self, prompt, **kwargs):
+                batches.append(prompt)
+                return SimpleNamespace(output=[ReadingCandidate(glucose_level=1)])
+
+        async def run(agents, prompts):
+            return await agents._run_extraction_batch(prompts)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ResponseCache(Path(tmpdir) / "cache.sqlite3", ttl_seconds=60)
+            agents = AgentSuite(
+                settings=AppSettings(),
+                extraction_agent=Extraction(),
+                batch_extraction_agent=BatchExtraction(),
+                cache=cache,
+            )
+            key = agents._cache_key(EXTRACTION_INSTRUCTIONS, "sugar 101")
+            cache.set(key, ReadingCandidate(glucose_level=101), ReadingCandidate)
+
+            results = asyncio.run(run(agents, ["sugar 101", "sugar 102", "sugar 103"]))
+            self.assertEqual([r.glucose_level for r in results], [101, 102, 103])
+            self.assertEqual(len(batches), 1)
+            self.assertNotIn("sugar 101", batches[0])
+            self.assertEqual(singles, ["sugar 102", "sugar 103"])
+
+            # With one uncached prompt left the batch agent is skipped entirely.
+            results = asyncio.run(run(agents, ["sugar 102", "sugar 104"]))
+            self.assertEqual([r.glucose_level for r in results], [102, 104])
+            self.assertEqual(len(batches), 1)
+            self.assertEqual(singles, ["sugar 102", "sugar 103", "sugar 104"])
+            cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from glucose_agent.batching import PromptBatcher
+
+
+class PromptBatcherTests(unittest.TestCase):
+    def test_identical_prompts_in_a_window_share_one_call(self):
+        calls = []
+
+        async def run(prompt):
+            calls.append(prompt)
+            await asyncio.sleep(0)
+            return prompt.upper()
+
+        async def scenario():
+            batcher = PromptBatcher(run, window_seconds=0.05, max_batch=8)
+            return await asyncio.gather(
+                batcher.submit("150 fasting"),
+                batcher.submit("150 fasting"),
+                batcher.submit("pp 160"),
+            )
+
+        results = asyncio.run(scenario())
+        self.assertEqual(results, ["150 FASTING", "150 FASTING", "PP 160"])
+        self.assertEqual(sorted(calls), ["150 fasting", "pp 160"])
+
+    def test_distinct_prompts_use_run_many_when_given(self):
+        batches = []
+
+        async def run(prompt):
+            raise AssertionError("single-prompt path should not be used")
+
+        async def run_many(prompts):
+            batches.append(list(prompts))
+            return [prompt.upper() for prompt in prompts]
+
+        async def scenario():
+            batcher = PromptBatcher(run, window_seconds=0.05, max_batch=8, run_many=run_many)
+            return await asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+
+        self.assertEqual(asyncio.run(scenario()), ["A", "B"])
+        self.assertEqual(batches, [["a", "b"]])
+
+    def test_errors_reach_every_waiting_caller(self):
+        async def run(prompt):
+            raise RuntimeError("model unavailable")
+
+        async def scenario():
+            batcher = PromptBatcher(run, window_seconds=0.01, max_batch=8)
+            return await asyncio.gather(
+                batcher.submit("a"), batcher.submit("a"), return_exceptions=True
+            )
+
+        results = asyncio.run(scenario())
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+    def test_aclose_stops_worker_and_cancels_waiting_prompts(self):
+        async def run(prompt):
+            await asyncio.sleep(10)
+
+        async def scenario():
+            batcher = PromptBatcher(run, window_seconds=0.01, max_batch=8)
+            pending = asyncio.ensure_future(batcher.submit("150 fasting"))
+            await asyncio.sleep(0.05)
+            worker = batcher._worker
+            await batcher.aclose()
+            with self.assertRaises(asyncio.CancelledError):
+                await pending
+            return worker
+
+        worker = asyncio.run(asyncio.wait_for(scenario(), timeout=1))
+        self.assertTrue(worker.done())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import asyncio
+import datetime as dt
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from glucose_agent.cache import ResponseCache, SemanticExtractionCache
+from glucose_agent.schemas import MealStatus, ReadingCandidate, RouterResult
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_round_trips_structured_output_for_normalized_prompt(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ResponseCache(Path(tmpdir) / "cache.sqlite3", ttl_seconds=60)
+            result = RouterResult(intent="education", reasoning="stub")
+
+            cache.set(cache.key("model", "What is NORMAL? "), result, RouterResult)
+
+            self.assertEqual(
+                cache.get(cache.key("model", "what is normal?"), RouterResult), result
+            )
+            self.assertIsNone(cache.get(cache.key("model", "hello"), RouterResult))
+            cache.close()
+
+    def test_expired_entries_are_ignored(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ResponseCache(Path(tmpdir) / "cache.sqlite3", ttl_seconds=-1)
+            cache.set("key", "reply", str)
+            self.assertIsNone(cache.get("key", str))
+            cache.close()
+
+    def test_writes_inside_a_loop_are_flushed_in_one_batch(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "cache.sqlite3"
+            cache = ResponseCache(path, ttl_seconds=60)
+
+            async def write_burst():
+                for index in range(5):
+                    cache.set(f"key-{index}", f"reply-{index}", str)
+                self.assertEqual(cache.get("key-3", str), "reply-3")
+
+            asyncio.run(write_burst())
+            cache.close()
+
+            with sqlite3.connect(path) as conn:
+                count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            self.assertEqual(count, 5)
+
+    def test_flush_prunes_expired_rows(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "cache.sqlite3"
+            cache = ResponseCache(path, ttl_seconds=-1)
+            cache.set("stale", "reply", str)
+            cache.ttl_seconds = 60
+            cache.set("fresh", "reply", str)
+            cache.close()
+
+            with sqlite3.connect(path) as conn:
+                keys = [row[0] for row in conn.execute("SELECT key FROM responses")]
+            self.assertEqual(keys, ["fresh"])
+
+    def test_lookups_do_not_wait_for_a_flush_in_progress(self):
+        writing, release = threading.Event(), threading.Event()
+
+        class SlowCache(ResponseCache):
+            def _write(self, rows):
+                writing.set()
+                release.wait(5)
+                super()._write(rows)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = SlowCache(Path(tmpdir) / "cache.sqlite3", ttl_seconds=60)
+            writer = threading.Thread(target=cache.set, args=("key", "reply", str))
+            writer.start()
+            self.assertTrue(writing.wait(5))
+            self.assertEqual(cache.get("key", str), "reply")
+            self.assertIsNone(cache.get("other", str))
+            release.set()
+            writer.join()
+            self.assertEqual(cache.get("key", str), "reply")
+            cache.close()
+
+
+class SemanticExtractionCacheTests(unittest.TestCase):
+    def test_paraphrase_reuses_relative_date_offset(self):
+        cache = SemanticExtractionCache(threshold=0.8)
+        stored_on = dt.date(2026, 4, 3)
+        cache.set(
+            "my sugar was 150 yesterday fasting",
+            stored_on,
+            ReadingCandidate(
+                glucose_level=150,
+                date=dt.date(2026, 4, 2),
+                meal_status=MealStatus.FASTING,
+            ),
+        )
+
+        hit = cache.get("Sugar was 150 yesterday, fasting", dt.date(2026, 4, 10))
+        self.assertEqual(hit.glucose_level, 150)
+        self.assertEqual(hit.date, dt.date(2026, 4, 9))
+        self.assertIsNone(cache.get("my sugar was 160 yesterday fasting", stored_on))
+
+    def test_meal_status_and_date_words_must_match(self):
+        cache = SemanticExtractionCache(threshold=0.5)
+        stored_on = dt.date(2026, 10, 13)
+        message = (
+            "checked my sugar on sunday before breakfast and it read 150 on the meter"
+        )
+        cache.set(
+            message,
+            stored_on,
+            ReadingCandidate(
+                glucose_level=150,
+                date=dt.date(2026, 10, 11),
+                meal_status=MealStatus.FASTING,
+            ),
+        )
+
+        after = message.replace("before", "after")
+        self.assertIsNone(cache.get(after, stored_on))
+        self.assertIsNone(cache.get(message.replace("sunday", "monday"), stored_on))
+        self.assertIsNone(cache.get(message, dt.date(2026, 10, 20)))
+        self.assertEqual(cache.get(message, stored_on).date, dt.date(2026, 10, 11))
+
+    def test_messages_without_relative_dates_only_match_on_the_same_day(self):
+        cache = SemanticExtractionCache(threshold=0.8)
+        stored_on = dt.date(2026, 10, 13)
+        cache.set(
+            "my sugar was 150 fasting",
+            stored_on,
+            ReadingCandidate(
+                glucose_level=150, date=stored_on, meal_status=MealStatus.FASTING
+            ),
+        )
+
+        hit = cache.get("sugar was 150, fasting", stored_on)
+        self.assertEqual(hit.date, stored_on)
+        self.assertIsNone(cache.get("sugar was 150, fasting", dt.date(2026, 10, 20)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,7 +5,11 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from glucose_agent.parser import extract_candidate_from_text, validate_candidate
+from glucose_agent.parser import (
+    extract_candidate_from_text,
+    has_glucose_token,
+    validate_candidate,
+)
 from glucose_agent.schemas import MealStatus
 
 
@@ -29,6 +33,48 @@ class ParserTests(unittest.TestCase):
         self.assertEqual(candidate.date, dt.date(2026, 4, 2))
         self.assertEqual(candidate.meal_status, MealStatus.PRANDIAL)
 
+    def test_extracts_bare_value_with_meal_context(self):
+        today = dt.date(2026, 4, 3)
+        candidate = extract_candidate_from_text("118 today fasting", today)
+        self.assertEqual(candidate.glucose_level, 118.0)
+        self.assertEqual(candidate.date, today)
+        self.assertIsNone(validate_candidate(candidate, today))
+
+        candidate = extract_candidate_from_text("pp 165 yesterday", today)
+        self.assertEqual(candidate.glucose_level, 165.0)
+        self.assertEqual(candidate.meal_status, MealStatus.PRANDIAL)
+
+    def test_ignores_durations_and_ambiguous_numbers(self):
+        today = dt.date(2026, 4, 3)
+        candidate = extract_candidate_from_text("walked 30 minutes after lunch", today)
+        self.assertIsNone(candidate.glucose_level)
+        candidate = extract_candidate_from_text("100 or 110 fasting", today)
+        self.assertIsNone(candidate.glucose_level)
+
+    def test_ignores_numbers_with_other_units(self):
+        today = dt.date(2026, 4, 3)
+        for text in (
+            "weighed 180 lbs this morning",
+            "weighed 82 kg this morning fasting",
+            "had 450 calories at breakfast",
+            "60 carbs after lunch",
+            "ate 40g of oats before breakfast",
+            "walked 45 min after dinner",
+            "took 900 steps after lunch",
+            "heart rate 72 bpm this morning",
+            "my weight is 180 lbs this morning",
+            "I'm 45 years old, what is a normal fasting range",
+            "Lunch for 20 people today, what's a good after meal target?",
+            "I drove route 66 today this morning",
+        ):
+            candidate = extract_candidate_from_text(text, today)
+            self.assertIsNone(candidate.glucose_level, text)
+
+    def test_glucose_token_prefilter(self):
+        self.assertTrue(has_glucose_token("sugar 118 this morning"))
+        self.assertFalse(has_glucose_token("thanks, see you in 2 days"))
+        self.assertFalse(has_glucose_token("what does a1c mean?"))
+
 
 if __name__ == "__main__":
     unittest.main()
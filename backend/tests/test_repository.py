@@ -1,8 +1,12 @@
+import datetime as dt
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
+from glucose_agent.analytics import build_stats, stats_from_aggregates
 from glucose_agent.repository import GlucoseRepository
+from glucose_agent.schemas import BloodSugarReading, ChatMessage, MealStatus
 
 
 class RepositoryTests(unittest.TestCase):
@@ -12,6 +16,70 @@ class RepositoryTests(unittest.TestCase):
             readings = repo.list_readings()
             self.assertGreaterEqual(len(readings), 5)
 
+    def test_saved_readings_update_running_aggregates(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = GlucoseRepository(Path(tmpdir) / "state.json")
+            repo.save_reading(
+                BloodSugarReading(
+                    glucose_level=150,
+                    date=dt.date.today(),
+                    meal_status=MealStatus.PRANDIAL,
+                )
+            )
+            self.assertEqual(
+                stats_from_aggregates(repo.get_aggregates()),
+                build_stats(repo.list_readings()),
+            )
+
+    def test_aggregates_are_reused_until_the_file_changes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = GlucoseRepository(Path(tmpdir) / "state.json")
+            first = repo.get_aggregates()
+            first.fasting.count += 10
+            with mock.patch.object(repo, "_read", wraps=repo._read) as read:
+                second = repo.get_aggregates()
+                self.assertEqual(read.call_count, 0)
+            self.assertEqual(second.fasting.count, first.fasting.count - 10)
+
+    def test_saving_reading_for_session_clears_pending_and_adds_reply(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = GlucoseRepository(Path(tmpdir) / "state.json")
+            reading = BloodSugarReading(
+                glucose_level=118, date=dt.date.today(), meal_status=MealStatus.FASTING
+            )
+            prompt = ChatMessage(role="assistant", content="Please confirm it below.")
+            repo.set_pending_reading("s", reading, messages=[prompt])
+            repo.save_reading(reading, session_id="s", reply="Saved your reading.")
+
+            session = repo.get_session("s")
+            self.assertIsNone(session.pending_reading)
+            self.assertEqual(
+                [message.content for message in session.history],
+                ["Please confirm it below.", "Saved your reading."],
+            )
+
+    def test_session_history_is_trimmed_to_limit(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = GlucoseRepository(Path(tmpdir) / "state.json", history_limit=3)
+            for index in range(5):
+                repo.append_message("s", "user", f"message {index}")
+            history = repo.get_session("s").history
+            self.assertEqual(
+                [message.content for message in history],
+                ["message 2", "message 3", "message 4"],
+            )
+
+    def test_cached_session_is_not_shared_with_callers(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = GlucoseRepository(Path(tmpdir) / "state.json")
+            repo.append_message("s", "user", "hello")
+            repo.get_session("s").history.clear()
+            self.assertEqual(len(repo.get_session("s").history), 1)
+            self.assertEqual(
+                len(GlucoseRepository(Path(tmpdir) / "state.json").get_session("s").history),
+                1,
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
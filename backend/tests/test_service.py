@@ -1,13 +1,20 @@
 import asyncio
+import datetime as dt
 import sys
 import tempfile
 import unittest
 from pathlib import Path
+from types import SimpleNamespace
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from glucose_agent.agents import AgentSuite
+from glucose_agent.agents import THANKS_REPLY, AgentSuite
 from glucose_agent.repository import GlucoseRepository
+from glucose_agent.schemas import (
+    MealStatus,
+    ReadingCandidate,
+    RouterResult,
+)
 from glucose_agent.service import GlucoseService
 from glucose_agent.settings import AppSettings
 
@@ -32,6 +39,106 @@ class ServiceTests(unittest.TestCase):
                 any(reading.glucose_level == 110.0 for reading in confirmed[1].readings)
             )
             self.assertGreaterEqual(confirmed[2].stats.total_readings, 1)
+            self.assertEqual(service.history_frame(), confirmed[1].model_dump_json())
+
+    def test_router_and_reply_run_concurrently(self):
+        replying = asyncio.Event()
+
+        class Router:
+            async def run(self, text):
+                await replying.wait()
+                return SimpleNamespace(
+                    output=RouterResult(intent="general_chat", reasoning="stub")
+                )
+
+        class Conversation:
+            async def run(self, prompt, **kwargs):
+                replying.set()
+                return SimpleNamespace(output="Happy to help.")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = GlucoseRepository(Path(tmpdir) / "state.json")
+            agents = AgentSuite(
+                settings=AppSettings(),
+                router_agent=Router(),
+                conversation_agent=Conversation(),
+            )
+            service = GlucoseService(repo, agents)
+
+            events = asyncio.run(
+                asyncio.wait_for(service.handle_message("s", "hello there"), timeout=1)
+            )
+            self.assertEqual(events[0].message, "Happy to help.")
+
+    def test_small_talk_skips_the_agents(self):
+        class Unused:
+            async def run(self, prompt, **kwargs):
+                raise AssertionError("small talk should not reach a model")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = GlucoseRepository(Path(tmpdir) / "state.json")
+            agents = AgentSuite(
+                settings=AppSettings(),
+                router_agent=Unused(),
+                conversation_agent=Unused(),
+            )
+            service = GlucoseService(repo, agents)
+
+            events = asyncio.run(service.handle_message("s", "Thanks!"))
+            self.assertEqual(events[0].message, THANKS_REPLY)
+            self.assertEqual(
+                [message.role for message in repo.get_session("s").history],
+                ["user", "assistant"],
+            )
+
+    def test_questions_with_stray_numbers_are_not_routed_as_readings(self):
+        agents = AgentSuite(settings=AppSettings())
+        today = dt.date(2026, 10, 14)
+        for text, intent in (
+            ("I'm 45 years old, what is a normal fasting range", "education"),
+            ("Lunch for 20 people today, what's a good after meal target?", "education"),
+            ("I drove route 66 today this morning", "general_chat"),
+            ("118 today fasting", "log_reading"),
+        ):
+            self.assertEqual(agents.classify_locally(text, today).intent, intent, text)
+
+    def test_weekday_extraction_is_not_replayed_on_another_day(self):
+        class Extraction:
+            async def run(self, prompt, **kwargs):
+                today = dt.date.fromisoformat(prompt.splitlines()[0].split()[-1])
+                monday = today - dt.timedelta(days=today.weekday() or 7)
+                return SimpleNamespace(
+                    output=ReadingCandidate(
+                        glucose_level=150, date=monday, meal_status=MealStatus.FASTING
+                    )
+                )
+
+        settings = AppSettings(extraction_batch_window_ms=0, llm_cache_ttl_seconds=0)
+        agents = AgentSuite(settings=settings, extraction_agent=Extraction())
+        message = "sugar 150 monday"
+        first = asyncio.run(agents.extract_reading(message, dt.date(2026, 10, 13)))
+        second = asyncio.run(agents.extract_reading(message, dt.date(2026, 10, 20)))
+        self.assertEqual(first.date, dt.date(2026, 10, 12))
+        self.assertEqual(second.date, dt.date(2026, 10, 19))
+
+    def test_incomplete_extractions_are_not_cached(self):
+        calls = []
+
+        class Extraction:
+            async def run(self, prompt, **kwargs):
+                calls.append(prompt)
+                return SimpleNamespace(output=ReadingCandidate(glucose_level=150))
+
+        settings = AppSettings(
+            extraction_batch_window_ms=0,
+            llm_cache_ttl_seconds=0,
+            semantic_cache_threshold=0.5,
+        )
+        agents = AgentSuite(settings=settings, extraction_agent=Extraction())
+        today = dt.date(2026, 10, 13)
+        asyncio.run(agents.extract_reading("sugar 150", today))
+        asyncio.run(agents.extract_reading("sugar 150", today))
+        self.assertEqual(len(calls), 2)
 
 
 if __name__ == "__main__":